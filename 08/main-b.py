@@ -1,10 +1,16 @@
 from __future__ import annotations
 
+import os
 import re
 import sys
 from dataclasses import dataclass
-from math import lcm
-from typing import Dict, Iterable, List
+from functools import partial
+from itertools import product
+from math import gcd, lcm
+from multiprocessing import Pool
+from typing import Dict, Iterable, List, Optional, Tuple
+
+PRINT = os.environ.get("PRINT", "false").lower() in ["true", "y"]
 
 
 @dataclass
@@ -49,29 +55,126 @@ def parse(lines: Iterable[str]) -> Game:
     return Game(instructions=instructions, nodes={n.value: n for n in nodes})
 
 
-def solve(game: Game) -> int:
-    # Solving for the whole array at once takes too long. So let use the least-common-multiple of
-    # each independent results.
-    def solve_one(startNode: str) -> int:
-        n_hops = 0
-        here = game.nodes[startNode]
-
-        while here.value[-1] != "Z":
-            match game.instructions[n_hops % len(game.instructions)]:
-                case "L":
-                    here = game.nodes[here.left]
-                case "R":
-                    here = game.nodes[here.right]
-                case e:
-                    raise ValueError(f"unknown instruction: {e}")
-            n_hops += 1
-
-        return n_hops
+def next_node(game: Game, node: str, instruction: str) -> str:
+    match instruction:
+        case "L":
+            return game.nodes[node].left
+        case "R":
+            return game.nodes[node].right
+        case e:
+            raise ValueError(f"unknown instruction: {e}")
+
+
+@dataclass
+class GhostCycle:
+    # steps at which the ghost stands on a Z node before entering its cycle
+    prefix_hits: List[int]
+    # first step of the cycle (on the (node, instruction index) state)
+    cycle_start: int
+    cycle_length: int
+    # steps at which the ghost stands on a Z node, within [cycle_start, cycle_start + cycle_length)
+    cycle_hits: List[int]
+
+    def is_hit(self, step: int) -> bool:
+        if step < self.cycle_start:
+            return step in self.prefix_hits
+
+        residue = (step - self.cycle_start) % self.cycle_length
+        return any((hit - self.cycle_start) == residue for hit in self.cycle_hits)
+
+    def lcm_shortcut_valid(self) -> bool:
+        # The ghost reaches Z exactly at every multiple of its cycle length (and nowhere else).
+        return (
+            not self.prefix_hits
+            and len(self.cycle_hits) == 1
+            and self.cycle_hits[0] == self.cycle_length
+        )
 
+
+def analyse_ghost(start_node: str, game: Game) -> GhostCycle:
+    seen: Dict[Tuple[str, int], int] = {}
+    hits: List[int] = []
+    node = start_node
+    step = 0
+
+    while True:
+        state = (node, step % len(game.instructions))
+        if state in seen:
+            break
+
+        seen[state] = step
+        if node[-1] == "Z":
+            hits.append(step)
+
+        node = next_node(game, node, game.instructions[state[1]])
+        step += 1
+
+    cycle_start = seen[state]
+    return GhostCycle(
+        prefix_hits=[h for h in hits if h < cycle_start],
+        cycle_start=cycle_start,
+        cycle_length=step - cycle_start,
+        cycle_hits=[h for h in hits if h >= cycle_start],
+    )
+
+
+def crt(left: Tuple[int, int], right: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+    # generalized CRT: solve t = a1 (mod m1) and t = a2 (mod m2), the moduli need not be coprime
+    a1, m1 = left
+    a2, m2 = right
+    g = gcd(m1, m2)
+    if (a2 - a1) % g != 0:
+        return None
+
+    k = ((a2 - a1) // g * pow(m1 // g, -1, m2 // g)) % (m2 // g)
+    modulus = m1 // g * m2
+    return ((a1 + m1 * k) % modulus, modulus)
+
+
+def combine(ghosts: List[GhostCycle]) -> Optional[int]:
+    all_cycling = max(g.cycle_start for g in ghosts)
+
+    # a meeting before every ghost is in its cycle must be a hit of the ghost with the longest prefix
+    latest = max(ghosts, key=lambda g: g.cycle_start)
+    for step in sorted(latest.prefix_hits):
+        if all(g.is_hit(step) for g in ghosts):
+            return step
+
+    # otherwise every ghost is cycling, so we solve the congruences for each choice of Z-hit
+    best: Optional[int] = None
+    for choice in product(*[g.cycle_hits for g in ghosts]):
+        combined: Optional[Tuple[int, int]] = (0, 1)
+        for hit, ghost in zip(choice, ghosts):
+            combined = crt(combined, (hit % ghost.cycle_length, ghost.cycle_length))
+            if combined is None:
+                break
+
+        if combined is None:
+            continue
+
+        residue, modulus = combined
+        step = residue + modulus * max(0, -((residue - all_cycling) // modulus))
+        if best is None or step < best:
+            best = step
+
+    return best
+
+
+def solve(game: Game) -> int:
     starts = [k for k in game.nodes.keys() if k[-1] == "A"]
-    solve_all = list(map(solve_one, starts))
+    with Pool() as p:
+        ghosts = p.map(partial(analyse_ghost, game=game), starts)
+
+    if all(g.lcm_shortcut_valid() for g in ghosts):
+        if PRINT:
+            print("LCM shortcut is valid for this network")
+        return lcm(*[g.cycle_length for g in ghosts])
+
+    result = combine(ghosts)
+    if result is None:
+        raise ValueError("ghosts never stand on Z nodes at the same time")
 
-    return lcm(*solve_all)
+    return result
 
 
 if __name__ == "__main__":
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import re
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+# Long-lived query service: the network is loaded once (from the file given as first argument),
+# then every line read on stdin is a batch of queries, answered with one line on stdout.
+#
+#   query  := NODE | NODE@OFFSET     (OFFSET is the index of the first instruction to follow)
+#   answer := the number of steps until a Z node is reached, or -1 if it never is
+#
+# A line with a bad query (unknown node, OFFSET not an integer) is answered with `error: ...`
+# instead, and the service keeps reading.
+#
+# Example:
+#   $ python service.py input.txt
+#   11A 22A 22B@1
+#   2 3 2
+#   11A QQQ
+#   error: unknown node QQQ
+
+CACHE_SIZE = 1 << 16
+
+
+@dataclass
+class Node:
+    value: str
+    left: str
+    right: str
+
+    def __repr__(self) -> str:
+        return f"{self.value} = ({self.left}, {self.right})"
+
+
+@dataclass
+class Game:
+    instructions: str
+    nodes: Dict[str, Node]
+
+    def __repr__(self) -> str:
+        s = self.instructions + "\n\n"
+
+        for n in self.nodes.values():
+            s += str(n)
+            s += "\n"
+
+        return s
+
+
+def parse(lines: Iterable[str]) -> Game:
+    instructions = next(lines).strip()
+    nodes: List[Node] = []
+
+    for l in lines:
+        l = l.strip()
+        if not l:
+            continue
+
+        matched = re.search(r"(\w+) = \((\w+), (\w+)\)", l)
+        nodes.append(
+            Node(value=matched.group(1), left=matched.group(2), right=matched.group(3))
+        )
+
+    return Game(instructions=instructions, nodes={n.value: n for n in nodes})
+
+
+def next_node(game: Game, node: str, instruction: str) -> str:
+    match instruction:
+        case "L":
+            return game.nodes[node].left
+        case "R":
+            return game.nodes[node].right
+        case e:
+            raise ValueError(f"unknown instruction: {e}")
+
+
+@dataclass
+class JumpTable:
+    # node reached after following the whole instruction string once
+    after_pass: Dict[str, str]
+    # first step (1-based, within one pass) at which a Z node is reached, if any
+    first_z: Dict[str, Optional[int]]
+
+
+def build_jump_table(game: Game) -> JumpTable:
+    after_pass: Dict[str, str] = {}
+    first_z: Dict[str, Optional[int]] = {}
+
+    for start in game.nodes:
+        here = start
+        first_z[start] = None
+        for step, instruction in enumerate(game.instructions, start=1):
+            here = next_node(game, here, instruction)
+            if first_z[start] is None and here[-1] == "Z":
+                first_z[start] = step
+        after_pass[start] = here
+
+    return JumpTable(after_pass=after_pass, first_z=first_z)
+
+
+class Service:
+    def __init__(self, game: Game, cache_size: int = CACHE_SIZE):
+        self.game = game
+        self.table = build_jump_table(game)
+        self.steps = lru_cache(maxsize=cache_size)(self._steps)
+
+    def _steps(self, start: str, offset: int) -> int:
+        if start[-1] == "Z":
+            return 0
+
+        instructions = self.game.instructions
+
+        # walk by hand up to the next instruction-string boundary...
+        here = start
+        n_hops = 0
+        if offset != 0:
+            for instruction in instructions[offset:]:
+                here = next_node(self.game, here, instruction)
+                n_hops += 1
+                if here[-1] == "Z":
+                    return n_hops
+
+        # ...then jump one full pass at a time. Coming back to an already seen node at a
+        # boundary (without a Z in between) means we are looping forever.
+        seen = set()
+        while here not in seen:
+            seen.add(here)
+            first_z = self.table.first_z[here]
+            if first_z is not None:
+                return n_hops + first_z
+
+            here = self.table.after_pass[here]
+            n_hops += len(instructions)
+
+        return -1
+
+    def query(self, query: str) -> int:
+        start, _, offset = query.partition("@")
+        if start not in self.game.nodes:
+            raise ValueError(f"unknown node {start}")
+
+        try:
+            n = int(offset or 0)
+        except ValueError:
+            raise ValueError(f"bad offset {offset}") from None
+
+        # offsets equal modulo the instructions length share the same cache entry
+        return self.steps(start, n % len(self.game.instructions))
+
+    def answer(self, line: str) -> str:
+        try:
+            results = [self.query(query) for query in line.split()]
+        except ValueError as e:
+            return f"error: {e}"
+
+        return " ".join(map(str, results))
+
+
+if __name__ == "__main__":
+    # Tests of the poor
+    test_game = parse(iter(["LLR", "", "AAA = (BBB, BBB)", "BBB = (AAA, ZZZ)"]))
+    test_game.nodes["ZZZ"] = Node(value="ZZZ", left="ZZZ", right="ZZZ")
+    test_service = Service(test_game)
+    assert test_service.answer("AAA BBB BBB@2 ZZZ") == "6 3 1 0"
+    assert test_service.answer("AAA QQQ") == "error: unknown node QQQ"
+    assert test_service.answer("BBB@x") == "error: bad offset x"
+    assert test_service.answer("BBB@5") == "1"
+    assert test_service.steps.cache_info().currsize == 4
+    # End tests of the poor
+
+    with open(sys.argv[1]) as f:
+        service = Service(parse(f))
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+
+        print(service.answer(line), flush=True)
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import os
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from math import comb
+from typing import Dict, Iterable, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Batch version of both parts: every row is extrapolated forward (part a) and backward (part b)
+# at once. Rows are grouped by length, and each group is a single (rows x length) @ (length x 2)
+# product against the binomial weights. Without numpy, or when int64 could overflow, we fall back
+# to exact Python integers.
+
+PRINT = os.environ.get("PRINT", "false").lower() in ["true", "y"]
+
+INT64_MAX = (1 << 63) - 1
+
+Game = List[List[int]]
+
+
+@dataclass
+class BatchResult:
+    forward: List[int]
+    backward: List[int]
+
+    @property
+    def forward_sum(self) -> int:
+        return sum(self.forward)
+
+    @property
+    def backward_sum(self) -> int:
+        return sum(self.backward)
+
+
+def parse(lines: Iterable[str]) -> Game:
+    return [
+        [int(elem.strip()) for elem in l.strip().split()] for l in lines if l.strip()
+    ]
+
+
+@lru_cache
+def extrapolation_weights(length: int) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+    # see `extrapolation_weights` in main-a.py and main-b.py
+    forward = tuple((-1) ** (length - 1 - i) * comb(length, i) for i in range(length))
+    backward = tuple((-1) ** i * comb(length, i + 1) for i in range(length))
+    return forward, backward
+
+
+def may_overflow(rows: Game, length: int) -> bool:
+    # |sum w_i x_i| <= max |x| * sum |w_i|, and sum |w_i| = 2^length - 1 for both directions.
+    # The weights themselves must fit in int64 too, even when every sample is 0.
+    max_abs = max(abs(x) for row in rows for x in row)
+    total_weight = (1 << length) - 1
+    return total_weight > INT64_MAX or max(max_abs, 1) * total_weight > INT64_MAX
+
+
+def solve_exact(rows: Game, length: int) -> Tuple[List[int], List[int]]:
+    forward, backward = extrapolation_weights(length)
+    return (
+        [sum(w * x for w, x in zip(forward, row)) for row in rows],
+        [sum(w * x for w, x in zip(backward, row)) for row in rows],
+    )
+
+
+def solve_matrix(rows: Game, length: int) -> Tuple[List[int], List[int]]:
+    weights = np.array(extrapolation_weights(length), dtype=np.int64).T
+    result = np.array(rows, dtype=np.int64) @ weights
+    return result[:, 0].tolist(), result[:, 1].tolist()
+
+
+def solve(game: Game) -> BatchResult:
+    groups: Dict[int, List[int]] = {}
+    for idx, row in enumerate(game):
+        groups.setdefault(len(row), []).append(idx)
+
+    forward = [0] * len(game)
+    backward = [0] * len(game)
+    for length, indices in groups.items():
+        if length == 0:
+            continue
+
+        rows = [game[idx] for idx in indices]
+        if np is None or may_overflow(rows, length):
+            group_forward, group_backward = solve_exact(rows, length)
+        else:
+            group_forward, group_backward = solve_matrix(rows, length)
+
+        for idx, f, b in zip(indices, group_forward, group_backward):
+            forward[idx] = f
+            backward[idx] = b
+
+    return BatchResult(forward=forward, backward=backward)
+
+
+if __name__ == "__main__":
+    # Tests of the poor
+    test = solve(
+        [[0, 3, 6, 9, 12, 15], [1, 3, 6, 10, 15, 21], [10, 13, 16, 21, 30, 45]]
+    )
+    assert test.forward == [18, 28, 68] and test.backward == [-3, 0, 5]
+    assert solve([[n**3 for n in range(100)]]).forward == [100**3]
+    test = solve([[0] * 67])
+    assert test.forward == [0] and test.backward == [0]
+    # End tests of the poor
+
+    game = parse(sys.stdin)
+    result = solve(game)
+
+    if PRINT:
+        for f, b in zip(result.forward, result.backward):
+            print(b, f)
+
+    print(result.forward_sum)
+    print(result.backward_sum)
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import sys
-from typing import Generator, Iterable, List, Optional
+from functools import lru_cache
+from math import comb
+from typing import Iterable, List, Tuple
 
 Game = List[List[int]]
 
@@ -16,25 +18,23 @@ def solve(game: Game) -> int:
     return sum(map(solve_single, game))
 
 
-def solve_single(sensor_samples: List[int]) -> int:
-    if all(map(lambda e: e == 0, sensor_samples)):
-        return 0
-
-    sums = list(compute_diff(sensor_samples))
-    return sensor_samples[0] - solve_single(sums)
+@lru_cache
+def extrapolation_weights(length: int) -> Tuple[int, ...]:
+    # Extrapolating with the difference table is the same as assuming the `length`-th difference
+    # is null, i.e. sum_i (-1)^i C(length, i) x_(i - 1) = 0. Solving for x_(-1) gives a fixed
+    # binomial-weighted sum of the samples.
+    return tuple((-1) ** i * comb(length, i + 1) for i in range(length))
 
 
-def compute_diff(samples: Iterable[int]) -> Generator[int, None, None]:
-    last: Optional[int] = None
-    for elem in samples:
-        if last != None:
-            yield elem - last
-
-        last = elem
+def solve_single(sensor_samples: List[int]) -> int:
+    weights = extrapolation_weights(len(sensor_samples))
+    return sum(w * s for w, s in zip(weights, sensor_samples))
 
 
 if __name__ == "__main__":
     # Tests of the poor
+    assert solve_single([10, 13, 16, 21, 30, 45]) == 5
+    assert solve_single([n**3 for n in range(3000)]) == -1
 
     # End tests of the poor
 
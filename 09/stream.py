@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import os
+import sys
+from typing import Iterable, List, Optional
+
+# Online version of part a: samples are appended one by one, and the next value can be asked at
+# any time. Only the last element of each difference level is kept.
+
+# When set, stop growing the difference table once the deepest difference has been 0 for that
+# many consecutive samples (so appends become O(degree)).
+FREEZE_AFTER = int(os.environ.get("FREEZE_AFTER", "0")) or None
+
+Game = List[List[int]]
+
+
+def parse(lines: Iterable[str]) -> Game:
+    return [
+        [int(elem.strip()) for elem in l.strip().split()] for l in lines if l.strip()
+    ]
+
+
+class SensorHistory:
+    def __init__(self, freeze_after: Optional[int] = None):
+        # lasts[k] is the last element of the k-th difference level
+        self.lasts: List[int] = []
+        self.freeze_after = freeze_after
+        self.zero_run = 0
+        # samples appended while frozen, each one being a level we didn't grow
+        self.skipped = 0
+
+    @property
+    def frozen(self) -> bool:
+        return self.freeze_after is not None and self.zero_run >= self.freeze_after
+
+    def append(self, sample: int):
+        value = sample
+        for level in range(len(self.lasts)):
+            value, self.lasts[level] = value - self.lasts[level], value
+
+        # `value` is now the newest element of the level below the deepest one we track. If it
+        # ever stops being 0, we are not frozen anymore and start growing again. Every level
+        # skipped while frozen only held zeros, so each of them now ends with `value` too.
+        if value == 0 and self.lasts:
+            self.zero_run += 1
+        else:
+            self.zero_run = 0
+
+        if self.frozen:
+            self.skipped += 1
+        else:
+            self.lasts.extend([value] * (self.skipped + 1))
+            self.skipped = 0
+
+    def next_value(self) -> int:
+        return sum(self.lasts)
+
+
+def solve(game: Game) -> int:
+    result = 0
+    for sensor_samples in game:
+        history = SensorHistory(freeze_after=FREEZE_AFTER)
+        for sample in sensor_samples:
+            history.append(sample)
+        result += history.next_value()
+
+    return result
+
+
+if __name__ == "__main__":
+    # Tests of the poor
+    history = SensorHistory(freeze_after=2)
+    for sample in [10, 13, 16, 21, 30, 45]:
+        history.append(sample)
+    assert history.next_value() == 68
+
+    history = SensorHistory(freeze_after=2)
+    for n in range(1000):
+        history.append(n**2)
+        assert history.next_value() == (n + 1) ** 2 or n < 2
+    assert len(history.lasts) == 4
+
+    for samples, expected in [
+        ([0, 0, 0, 5], 20),
+        ([0, 0, 0, 0, 0, 1], 6),
+        ([1, 1, 1, 1, 2, 3, 5, 8], -13),
+    ]:
+        history = SensorHistory(freeze_after=2)
+        for sample in samples:
+            history.append(sample)
+        assert history.next_value() == expected
+    # End tests of the poor
+
+    game = parse(sys.stdin)
+    result = solve(game)
+
+    print(result)
@@ -2,11 +2,16 @@ from __future__ import annotations
 
 import os
 import sys
+from collections import deque
 from dataclasses import dataclass
-from itertools import pairwise
-from typing import Iterable, List, Optional, Set
+from functools import partial
+from itertools import chain, pairwise
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from typing import Deque, Iterable, Iterator, List, Optional, Set
 
 PRINT = os.environ.get("PRINT", "false").lower() in ["true", "y"]
+METHOD = os.environ.get("METHOD", "pick")
 
 
 @dataclass
@@ -18,14 +23,10 @@ class Pos:
         return f"({self.y}, {self.x})"
 
     def __hash__(self) -> int:
-        return hash(self.x) + hash(self.y)
-
-    def __add__(self, other):
-        return Pos(self.y + other.y, self.x + other.x)
+        return hash((self.y, self.x))
 
 
 Path = List[Pos]
-UnorderedPath = Set[Pos]
 
 
 @dataclass
@@ -33,12 +34,6 @@ class Game:
     grid: List[List[str]]
     s_pos: Pos
 
-    def at(self, pos: Pos) -> Optional[str]:
-        if is_valid_pos(self, pos):
-            return self.grid[pos.y][pos.x]
-
-        return None
-
 
 def parse(lines: Iterable[str]) -> Game:
     start_pos: Optional[Pos] = None
@@ -55,183 +50,283 @@ def parse(lines: Iterable[str]) -> Game:
     return Game(grid=grid, s_pos=start_pos)
 
 
+# Each tile is compiled to the bitmask of the directions it connects to.
+NORTH, EAST, SOUTH, WEST = 1, 2, 4, 8
+PIPES = {
+    "|": NORTH | SOUTH,
+    "-": EAST | WEST,
+    "L": NORTH | EAST,
+    "J": NORTH | WEST,
+    "7": SOUTH | WEST,
+    "F": SOUTH | EAST,
+}
+OPPOSITE = {NORTH: SOUTH, EAST: WEST, SOUTH: NORTH, WEST: EAST}
+
+
+@dataclass
+class CompiledGrid:
+    # direction bitmask of each tile, indexed by `y * width + x`. The grid is padded with an
+    # empty border, so walking never has to check bounds.
+    tiles: bytearray
+    width: int
+    start: int
+
+    def delta(self, direction: int) -> int:
+        if direction == NORTH:
+            return -self.width
+        if direction == EAST:
+            return 1
+        if direction == SOUTH:
+            return self.width
+        if direction == WEST:
+            return -1
+
+        raise ValueError(f"unknown direction: {direction}")
+
+    def to_pos(self, idx: int) -> Pos:
+        y, x = divmod(idx, self.width)
+        return Pos(y=y - 1, x=x - 1)
+
+
+def compile_grid(game: Game) -> CompiledGrid:
+    width = max(len(line) for line in game.grid) + 2
+    tiles = bytearray(width * (len(game.grid) + 2))
+    for y, line in enumerate(game.grid, start=1):
+        for x, cell in enumerate(line, start=1):
+            tiles[y * width + x] = PIPES.get(cell, 0)
+
+    compiled = CompiledGrid(
+        tiles=tiles, width=width, start=(game.s_pos.y + 1) * width + game.s_pos.x + 1
+    )
+
+    # S connects to the neighbors that connect back to it
+    s_tile = 0
+    for direction, back in OPPOSITE.items():
+        if tiles[compiled.start + compiled.delta(direction)] & back:
+            s_tile |= direction
+    assert bin(s_tile).count("1") == 2, "we should always have two working neighbors"
+    tiles[compiled.start] = s_tile
+
+    return compiled
+
+
+def walk_loop(compiled: CompiledGrid) -> Iterator[int]:
+    # Walks the loop once, yielding the flat index of each tile (starting at S). The tile we enter
+    # and the direction we come from are enough to know where to go next: no `seen` set needed.
+    tiles = compiled.tiles
+    deltas = {d: compiled.delta(d) for d in OPPOSITE}
+
+    idx = compiled.start
+    direction = tiles[idx] & -tiles[idx]  # lowest bit
+    while True:
+        yield idx
+        idx += deltas[direction]
+        if idx == compiled.start:
+            return
+
+        direction = tiles[idx] ^ OPPOSITE[direction]
+
+
 def find_path(game: Game) -> Path:
-    seen: UnorderedPath = {game.s_pos}
-    path: Path = [game.s_pos]
-    current: Optional[Pos] = game.s_pos
+    compiled = compile_grid(game)
+    return [compiled.to_pos(idx) for idx in walk_loop(compiled)]
 
-    while current is not None:
-        not_already_visited_neighbors = list(
-            filter(lambda p: p not in seen, neighbors(game, current))
-        )
-        if not not_already_visited_neighbors:
-            break
 
-        current = not_already_visited_neighbors[0]
-        path.append(current)
-        seen.add(current)
+def solve_pick(game: Game) -> int:
+    # Shoelace formula for the area enclosed by the loop (going through the cells' centers),
+    # then Pick's theorem (A = i + b/2 - 1) to get the number i of interior tiles from the
+    # number b of tiles on the loop.
+    compiled = compile_grid(game)
+    width = compiled.width
 
-    return path
+    double_area = 0
+    boundary = 0
+    for current, next in pairwise(chain(walk_loop(compiled), [compiled.start])):
+        current_y, current_x = divmod(current, width)
+        next_y, next_x = divmod(next, width)
+        double_area += current_x * next_y - next_x * current_y
+        boundary += 1
 
+    return (abs(double_area) - boundary) // 2 + 1
 
-def solve(game: Game) -> int:
+
+def solve_coloring(game: Game) -> int:
     # we first compute the path that circles in the game
     path = find_path(game)
     if PRINT:
         print(path)
 
-    # we are now only interested in the path in the grid, where we mark the path (P) cells
-    # and unknown (?) cells.
-    zone_grid = [
-        [("B" if Pos(y=y, x=x) in path else "?") for x in range(len(line))]
-        for y, line in enumerate(game.grid)
-    ]
-    zone_game = Game(grid=zone_grid, s_pos=Pos(0, 0))
+    # we are now only interested in the path in the grid, where we mark the path (B) cells
+    # and unknown (?) cells. Cells are addressed by their flat index `y * width + x`.
+    height = len(game.grid)
+    width = max(len(line) for line in game.grid)
+    on_loop = bytearray(height * width)
+    for p in path:
+        on_loop[p.y * width + p.x] = 1
+
+    zone = bytearray(ord("B") if b else ord("?") for b in on_loop)
+
+    def print_zone():
+        for y in range(height):
+            print(zone[y * width : (y + 1) * width].decode())
+
     if PRINT:
-        for l in zone_game.grid:
-            print("".join(l))
+        print_zone()
 
-    def assign_if_free(pos: Pos, label: str) -> bool:
-        if not is_valid_pos(zone_game, pos):
-            return False
+    to_visit: Deque[int] = deque()
+    # labels that tried to leave the grid: that side of the loop is the outside
+    outside: Set[bytes] = set()
 
-        if zone_game.grid[pos.y][pos.x] != "?":
-            return False
+    def assign_if_free(y: int, x: int, label: bytes):
+        if y < 0 or x < 0 or y >= height or x >= width:
+            outside.add(label)
+            return
 
-        zone_game.grid[pos.y][pos.x] = label
-        return True
+        idx = y * width + x
+        if zone[idx] != ord("?"):
+            return
 
-    # we _color_ each direct neighbors of our path with A or B (could be internal/external, but we
-    # don't know here if it's internal/external)
-    for current, next in pairwise(path):
+        zone[idx] = ord(label)
+        to_visit.append(idx)
+
+    # we _color_ each direct neighbors of our path with I or O (could be internal/external, but
+    # we don't know here if it's internal/external). Both ends of each move are colored, so that
+    # cells touching the loop only at a corner also get a color.
+    for current, next in pairwise(chain(path, [game.s_pos])):
         dx = next.x - current.x
         dy = next.y - current.y
 
         assert dx == 0 or dy == 0, "well we only move to one cell. Or, am I wrong?"
 
-        if dx == 1:
-            assign_if_free(Pos(y=current.y - 1, x=current.x), "I")
-            assign_if_free(Pos(y=current.y + 1, x=current.x), "O")
-        elif dx == -1:
-            assign_if_free(Pos(y=current.y - 1, x=current.x), "O")
-            assign_if_free(Pos(y=current.y + 1, x=current.x), "I")
-        elif dy == 1:
-            assign_if_free(Pos(y=current.y, x=current.x + 1), "I")
-            assign_if_free(Pos(y=current.y, x=current.x - 1), "O")
-        elif dy == -1:
-            assign_if_free(Pos(y=current.y, x=current.x + 1), "O")
-            assign_if_free(Pos(y=current.y, x=current.x - 1), "I")
-        else:
-            ValueError("don't know in which direction we are going.")
-
-    # then, we propagate the solution iteratively
-    for epoch in range(100):
-        did_change = False
-        if PRINT:
-            print(epoch, ":")
-            for l in zone_game.grid:
-                print("".join(l))
-        for y, line in enumerate(zone_game.grid):
-            for x, cell in enumerate(line):
-                if cell != "?":
-                    continue
-
-                neighbors_value = {
-                    zone_game.grid[y + dy][x + dx]
-                    for dy, dx in [(1, 0), (-1, 0), (0, 1), (0, -1)]
-                    if is_valid_pos(zone_game, Pos(y=y + dy, x=x + dx))
-                }
-                assert not (
-                    "I" in neighbors_value and "O" in neighbors_value
-                ), "well, the logic is flawed as we are both internal and external"
-
-                for possible in ["I", "O"]:
-                    if possible in neighbors_value:
-                        did_change |= assign_if_free(Pos(y=y, x=x), possible)
-
-        if not did_change:
-            print(f"early stop after {epoch} steps")
-            break
-
-    for l in zone_game.grid:
-        print("".join(l))
-
-    counts = {k: 0 for k in ["I", "O", "?"]}
-
-    for l in zone_game.grid:
-        for c in l:
-            if c in counts:
-                counts[c] = counts[c] + 1
-
-    print(counts)
+        for p in [current, next]:
+            if dx == 1:
+                assign_if_free(p.y - 1, p.x, b"I")
+                assign_if_free(p.y + 1, p.x, b"O")
+            elif dx == -1:
+                assign_if_free(p.y - 1, p.x, b"O")
+                assign_if_free(p.y + 1, p.x, b"I")
+            elif dy == 1:
+                assign_if_free(p.y, p.x + 1, b"I")
+                assign_if_free(p.y, p.x - 1, b"O")
+            elif dy == -1:
+                assign_if_free(p.y, p.x + 1, b"O")
+                assign_if_free(p.y, p.x - 1, b"I")
+            else:
+                raise ValueError("don't know in which direction we are going.")
+
+    # then, we propagate the colors with a flood fill, each cell is visited once
+    while to_visit:
+        idx = to_visit.popleft()
+        y, x = divmod(idx, width)
+        label = bytes(zone[idx : idx + 1])
+        for dy, dx in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+            assign_if_free(y + dy, x + dx, label)
+
+    if PRINT:
+        print_zone()
+
+    counts = {k: zone.count(k.encode()) for k in ["I", "O", "?"]}
+    if PRINT:
+        print(counts)
+
+    # We don't know which side is the inside: the outside is the one reaching past the border.
+    # When the loop runs along the whole border, only the seeds of the outside side fall off.
+    if b"I" in outside:
+        return counts["O"]
 
     return counts["I"]
 
 
-def is_valid_pos(game: Game, pos: Pos) -> bool:
-    return (
-        pos.x >= 0
-        and pos.y >= 0
-        and pos.y < len(game.grid)
-        and pos.x < len(game.grid[pos.y])
-    )
+# Loop mask values, for the scanline engine.
+OFF_LOOP, ON_LOOP, CROSSING = 0, 1, 3
 
+# set in each worker process by `attach_mask`
+worker_mask: Optional[SharedMemory] = None
+
+
+def attach_mask(name: str):
+    global worker_mask
+    worker_mask = SharedMemory(name=name)
+
+
+def count_rows(rows: range, width: int) -> List[int]:
+    # Walking a row from the left, we toggle between outside and inside each time we cross the
+    # loop. Only tiles connected to the north count as a crossing: `L-7` is one, `L-J` is none.
+    assert worker_mask is not None
+    mask = worker_mask.buf
+    counts: List[int] = []
+    for y in rows:
+        inside = False
+        count = 0
+        for idx in range(y * width, (y + 1) * width):
+            cell = mask[idx]
+            if cell == CROSSING:
+                inside = not inside
+            elif inside and cell == OFF_LOOP:
+                count += 1
+        counts.append(count)
+
+    return counts
 
-def neighbors_naive(game: Game, pos: Pos) -> List[Pos]:
-    if not is_valid_pos(game, pos):
-        return []
-
-    match game.grid[pos.y][pos.x]:
-        case "|":
-            return [Pos(y=pos.y + 1, x=pos.x), Pos(y=pos.y - 1, x=pos.x)]
-        case "-":
-            return [Pos(y=pos.y, x=pos.x + 1), Pos(y=pos.y, x=pos.x - 1)]
-        case "L":
-            return [Pos(y=pos.y - 1, x=pos.x), Pos(y=pos.y, x=pos.x + 1)]
-        case "J":
-            return [Pos(y=pos.y - 1, x=pos.x), Pos(y=pos.y, x=pos.x - 1)]
-        case "7":
-            return [Pos(y=pos.y + 1, x=pos.x), Pos(y=pos.y, x=pos.x - 1)]
-        case "F":
-            return [Pos(y=pos.y + 1, x=pos.x), Pos(y=pos.y, x=pos.x + 1)]
-        case ".":
-            return []
-        case "S":
-            checks = {
-                # south
-                Pos(y=1, x=0): ["|", "L", "J"],
-                # north
-                Pos(y=-1, x=0): ["|", "7", "F"],
-                # east
-                Pos(y=0, x=1): ["-", "J", "7"],
-                # west
-                Pos(y=0, x=-1): ["-", "L", "F"],
-            }
-
-            valid_neighbors = []
-            for delta, expected in checks.items():
-                location = pos + delta
-                if game.at(location) in expected:
-                    valid_neighbors.append(location)
-
-            assert (
-                len(valid_neighbors) == 2
-            ), "we should always have two working neighbors around the start"
-            return valid_neighbors
-
-
-def neighbors(game: Game, pos: Pos) -> List[Pos]:
-    return list(
-        filter(
-            lambda p: is_valid_pos(game, p),
-            neighbors_naive(game, pos),
-        )
-    )
+
+def solve_scanline(game: Game) -> int:
+    compiled = compile_grid(game)
+    mask = bytearray(len(compiled.tiles))
+    for idx in walk_loop(compiled):
+        mask[idx] = CROSSING if compiled.tiles[idx] & NORTH else ON_LOOP
+
+    # rows are independent once the mask exists, so they are split across workers
+    height = len(compiled.tiles) // compiled.width
+    n_chunks = min(height, os.cpu_count() or 1)
+    chunks = [
+        range(height * i // n_chunks, height * (i + 1) // n_chunks)
+        for i in range(n_chunks)
+    ]
+
+    shared = SharedMemory(create=True, size=len(mask))
+    try:
+        shared.buf[: len(mask)] = mask
+        with Pool(n_chunks, initializer=attach_mask, initargs=(shared.name,)) as p:
+            row_counts = list(
+                chain.from_iterable(
+                    p.map(partial(count_rows, width=compiled.width), chunks)
+                )
+            )
+    finally:
+        shared.close()
+        shared.unlink()
+
+    if PRINT:
+        # the first and last rows are the padding
+        for y, count in enumerate(row_counts[1:-1]):
+            print(f"{y}: {count}")
+
+    return sum(row_counts)
+
+
+def solve(game: Game) -> int:
+    match METHOD:
+        case "pick":
+            return solve_pick(game)
+        case "coloring":
+            return solve_coloring(game)
+        case "scanline":
+            return solve_scanline(game)
+        case e:
+            raise ValueError(f"unknown method: {e}")
 
 
 if __name__ == "__main__":
     # Tests of the poor
-
+    test = ["S--7", "|..|", "L--J"]
+    for _ in range(4):
+        test_game = parse(iter(test))
+        assert solve_pick(test_game) == 2
+        assert solve_coloring(test_game) == 2
+        assert solve_scanline(test_game) == 2
+        # rotate a quarter turn clockwise
+        test = ["".join(row) for row in zip(*reversed(test))]
+        test = [l.translate(str.maketrans("|-LF7J", "-|F7JL")) for l in test]
     # End tests of the poor
 
     game = parse(sys.stdin)
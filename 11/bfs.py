@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import os
+import sys
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from typing import Iterable, List, Optional
+
+# BFS version of the all-pairs sum, for universes where the Manhattan distance isn't enough:
+# any cell which is neither `.` nor `#` is an obstacle. The universe isn't expanded here.
+#
+# The grid is put once in shared memory (as a flat byte array with an obstacle border), and
+# workers only receive the index of the galaxy to start from.
+
+FREE, WALL = 1, 0
+
+
+@dataclass
+class Game:
+    # `y * width + x` (including the border) -> FREE or WALL
+    cells: bytearray
+    width: int
+    # flat indices of the galaxies
+    galaxies: List[int]
+
+
+def parse(lines: Iterable[str]) -> Game:
+    grid = [l.strip() for l in lines if l.strip()]
+    width = max(len(line) for line in grid) + 2
+    cells = bytearray(width * (len(grid) + 2))
+    galaxies: List[int] = []
+
+    for y, line in enumerate(grid, start=1):
+        for x, cell in enumerate(line, start=1):
+            if cell in ".#":
+                cells[y * width + x] = FREE
+            if cell == "#":
+                galaxies.append(y * width + x)
+
+    return Game(cells=cells, width=width, galaxies=galaxies)
+
+
+# set in each worker process by `attach`
+worker_cells: Optional[SharedMemory] = None
+worker_width = 0
+worker_galaxies: List[int] = []
+
+
+def attach(name: str, width: int, galaxies: List[int]):
+    global worker_cells, worker_width, worker_galaxies
+    worker_cells = SharedMemory(name=name)
+    worker_width = width
+    worker_galaxies = galaxies
+
+
+def distances_from(start: int) -> array:
+    # Distances from galaxy `start` to every galaxy after it (-1 when unreachable). The BFS
+    # stops as soon as all of them have been reached.
+    assert worker_cells is not None
+    cells = worker_cells.buf
+    targets = {g: i for i, g in enumerate(worker_galaxies[start + 1 :])}
+    result = array("q", [-1]) * len(targets)
+
+    source = worker_galaxies[start]
+    seen = bytearray(len(cells))
+    seen[source] = 1
+    to_visit = deque([source])
+    dist = 0
+    remaining = len(targets)
+
+    while to_visit and remaining:
+        for _ in range(len(to_visit)):
+            idx = to_visit.popleft()
+            target = targets.get(idx)
+            if target is not None:
+                result[target] = dist
+                remaining -= 1
+
+            for n in (idx - worker_width, idx + 1, idx + worker_width, idx - 1):
+                if cells[n] == FREE and not seen[n]:
+                    seen[n] = 1
+                    to_visit.append(n)
+        dist += 1
+
+    return result
+
+
+def solve(game: Game) -> int:
+    shared = SharedMemory(create=True, size=len(game.cells))
+    try:
+        shared.buf[: len(game.cells)] = game.cells
+        with Pool(
+            initializer=attach, initargs=(shared.name, game.width, game.galaxies)
+        ) as p:
+            chunksize = max(1, len(game.galaxies) // (4 * (os.cpu_count() or 1)))
+            rows = p.imap_unordered(
+                distances_from, range(len(game.galaxies)), chunksize=chunksize
+            )
+            return sum(sum(d for d in row if d >= 0) for row in rows)
+    finally:
+        shared.close()
+        shared.unlink()
+
+
+if __name__ == "__main__":
+    # Tests of the poor
+    assert solve(parse(iter(["#.#", "...", "#.#"]))) == 4 * 2 + 2 * 4
+    assert solve(parse(iter(["#X#", ".X.", "..."]))) == 6
+    # End tests of the poor
+
+    game = parse(sys.stdin)
+    result = solve(game)
+
+    print(result)
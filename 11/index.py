@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import heapq
+import os
+import sys
+from dataclasses import dataclass
+from itertools import accumulate, islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Spatial index over the (expanded) galaxies, to answer "closest galaxy to X", "galaxies within
+# distance r of X" and "k closest pairs" without looking at all the pairs. The index is a 2-d
+# tree under the Manhattan (L1) distance.
+
+EXPANSION = int(os.environ.get("EXPANSION", "2"))
+K = int(os.environ.get("K", "10"))
+
+
+@dataclass
+class Pos:
+    y: int
+    x: int
+
+    def __repr__(self) -> str:
+        return f"({self.y}, {self.x})"
+
+    def __hash__(self) -> int:
+        return hash((self.y, self.x))
+
+
+Game = List[Pos]
+
+
+def empty_before(is_empty: List[bool]) -> List[int]:
+    # number of empty rows (or columns) strictly before each index
+    return [0] + list(accumulate(is_empty))[:-1]
+
+
+def parse(lines: Iterable[str], expansion: int = EXPANSION) -> Game:
+    # see `parse` in main-a.py
+    grid = [l.strip() for l in lines if l.strip()]
+    galaxies = [
+        Pos(y=y, x=x)
+        for y, line in enumerate(grid)
+        for x, cell in enumerate(line)
+        if cell == "#"
+    ]
+
+    rows_with_galaxy = {g.y for g in galaxies}
+    cols_with_galaxy = {g.x for g in galaxies}
+    rows_before = empty_before([y not in rows_with_galaxy for y in range(len(grid))])
+    cols_before = empty_before([x not in cols_with_galaxy for x in range(len(grid[0]))])
+
+    return [
+        Pos(
+            y=g.y + (expansion - 1) * rows_before[g.y],
+            x=g.x + (expansion - 1) * cols_before[g.x],
+        )
+        for g in galaxies
+    ]
+
+
+def distance(left: Pos, right: Pos) -> int:
+    return abs(left.y - right.y) + abs(left.x - right.x)
+
+
+def unique_sorted(
+    items: Iterable[Tuple[int, int, int]]
+) -> Iterator[Tuple[int, int, int]]:
+    last: Optional[Tuple[int, int, int]] = None
+    for item in items:
+        if item != last:
+            yield item
+        last = item
+
+
+class GalaxyIndex:
+    def __init__(self, galaxies: Game):
+        self.galaxies = galaxies
+        # Implicit tree: the node of range [lo, hi) is its middle element, splitting on y at even
+        # depths and on x at odd depths, with its subtrees in [lo, mid) and (mid, hi).
+        self.order = list(range(len(galaxies)))
+        self._build(0, len(self.order), 0)
+
+    def _coordinate(self, idx: int, depth: int) -> int:
+        g = self.galaxies[idx]
+        return g.y if depth % 2 == 0 else g.x
+
+    def _build(self, lo: int, hi: int, depth: int):
+        if hi - lo <= 1:
+            return
+
+        self.order[lo:hi] = sorted(
+            self.order[lo:hi], key=lambda i: self._coordinate(i, depth)
+        )
+        mid = (lo + hi) // 2
+        self._build(lo, mid, depth + 1)
+        self._build(mid + 1, hi, depth + 1)
+
+    def k_nearest(
+        self, target: Pos, k: int, exclude: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        # (distance, galaxy index) of the k galaxies closest to `target`, closest first
+        heap: List[Tuple[int, int]] = []  # max-heap on the distance, through negation
+
+        def visit(lo: int, hi: int, depth: int):
+            if lo >= hi:
+                return
+
+            mid = (lo + hi) // 2
+            idx = self.order[mid]
+            if idx != exclude:
+                d = distance(target, self.galaxies[idx])
+                if len(heap) < k:
+                    heapq.heappush(heap, (-d, idx))
+                elif d < -heap[0][0]:
+                    heapq.heapreplace(heap, (-d, idx))
+
+            split = self._coordinate(idx, depth)
+            here = target.y if depth % 2 == 0 else target.x
+            near, far = ((lo, mid), (mid + 1, hi))
+            if here > split:
+                near, far = far, near
+
+            visit(*near, depth + 1)
+            # every galaxy on the other side is at least |here - split| away
+            if len(heap) < k or abs(here - split) < -heap[0][0]:
+                visit(*far, depth + 1)
+
+        visit(0, len(self.order), 0)
+        return sorted((-d, idx) for d, idx in heap)
+
+    def nearest(self, target: Pos, exclude: Optional[int] = None) -> Tuple[int, int]:
+        (found,) = self.k_nearest(target, 1, exclude=exclude)
+        return found
+
+    def within(self, target: Pos, radius: int) -> List[int]:
+        found: List[int] = []
+
+        def visit(lo: int, hi: int, depth: int):
+            if lo >= hi:
+                return
+
+            mid = (lo + hi) // 2
+            idx = self.order[mid]
+            if distance(target, self.galaxies[idx]) <= radius:
+                found.append(idx)
+
+            split = self._coordinate(idx, depth)
+            here = target.y if depth % 2 == 0 else target.x
+            if here - radius <= split:
+                visit(lo, mid, depth + 1)
+            if here + radius >= split:
+                visit(mid + 1, hi, depth + 1)
+
+        visit(0, len(self.order), 0)
+        return found
+
+    def closest_pairs(self, k: int) -> Iterator[Tuple[int, int, int]]:
+        # Streams the k closest pairs as (distance, i, j) with i < j. For each of the k closest
+        # pairs (i, j), j is among the k nearest neighbors of i, so we only have to merge
+        # each galaxy's k nearest neighbors (O(g * k) memory instead of O(g^2)).
+        per_galaxy = (
+            [(d, min(i, j), max(i, j)) for d, j in self.k_nearest(g, k, exclude=i)]
+            for i, g in enumerate(self.galaxies)
+        )
+
+        return islice(unique_sorted(heapq.merge(*per_galaxy)), k)
+
+
+if __name__ == "__main__":
+    # Tests of the poor
+    test = parse(iter(["#...#", ".....", "#.#.."]))
+    test_index = GalaxyIndex(test)
+    assert test_index.nearest(Pos(y=0, x=0), exclude=0) == (3, 2)
+    assert sorted(test_index.within(Pos(y=3, x=3), 3)) == [2, 3]
+    all_pairs = sorted(
+        (distance(test[i], test[j]), i, j)
+        for i in range(len(test))
+        for j in range(i + 1, len(test))
+    )
+    assert list(test_index.closest_pairs(4)) == all_pairs[:4]
+    # End tests of the poor
+
+    game = parse(sys.stdin)
+    index = GalaxyIndex(game)
+
+    for d, i, j in index.closest_pairs(K):
+        print(f"{game[i]} <-> {game[j]}: {d}")
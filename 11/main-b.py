@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import Iterable, List
+
+# each empty row or column is replaced by this many empty rows or columns
+EXPANSION = 1000000
+
+
+@dataclass
+class Pos:
+    y: int
+    x: int
+
+    def __repr__(self) -> str:
+        return f"({self.y}, {self.x})"
+
+    def __hash__(self) -> int:
+        return hash((self.y, self.x))
+
+
+# positions of the galaxies, in the expanded universe
+Game = List[Pos]
+
+
+def empty_before(is_empty: List[bool]) -> List[int]:
+    # number of empty rows (or columns) strictly before each index
+    return [0] + list(accumulate(is_empty))[:-1]
+
+
+def parse(lines: Iterable[str], expansion: int = EXPANSION) -> Game:
+    grid = [l.strip() for l in lines if l.strip()]
+    galaxies = [
+        Pos(y=y, x=x)
+        for y, line in enumerate(grid)
+        for x, cell in enumerate(line)
+        if cell == "#"
+    ]
+
+    # The expansion is only a coordinate transform: a galaxy moves by (expansion - 1) for each
+    # empty row above it (and each empty column on its left). We never build the expanded grid.
+    rows_with_galaxy = {g.y for g in galaxies}
+    cols_with_galaxy = {g.x for g in galaxies}
+    rows_before = empty_before([y not in rows_with_galaxy for y in range(len(grid))])
+    cols_before = empty_before([x not in cols_with_galaxy for x in range(len(grid[0]))])
+
+    return [
+        Pos(
+            y=g.y + (expansion - 1) * rows_before[g.y],
+            x=g.x + (expansion - 1) * cols_before[g.x],
+        )
+        for g in galaxies
+    ]
+
+
+def sum_pairwise_distances(coordinates: List[int]) -> int:
+    # Once sorted, each coordinate is the largest of all the previous ones, so its distances to
+    # them sum up to `i * c_i - (c_0 + ... + c_(i-1))`.
+    total = 0
+    prefix = 0
+    for i, c in enumerate(sorted(coordinates)):
+        total += i * c - prefix
+        prefix += c
+
+    return total
+
+
+def solve(game: Game) -> int:
+    # Nothing blocks the way between galaxies, so the shortest path is the Manhattan distance,
+    # which sums independently over both axes.
+    return sum_pairwise_distances([g.y for g in game]) + sum_pairwise_distances(
+        [g.x for g in game]
+    )
+
+
+if __name__ == "__main__":
+    # Tests of the poor
+    assert sum_pairwise_distances([3, 0, 1]) == 6
+    test = ["...#", "....", "#..."]
+    assert solve(parse(iter(test), expansion=10)) == (2 + 9) + (3 + 2 * 9)
+    # End tests of the poor
+
+    game = parse(sys.stdin)
+    print(game)
+    result = solve(game)
+
+    print(result)
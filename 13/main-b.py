@@ -1,13 +1,33 @@
 from __future__ import annotations
 
+import os
+import random
 import sys
+from collections import deque
 from dataclasses import dataclass
-from itertools import pairwise
-from typing import Iterable, Iterator, List, Optional
+from itertools import islice
+from multiprocessing import Pool
+from multiprocessing.pool import AsyncResult
+from typing import Deque, Iterable, Iterator, List
 
-Pattern = List[str]
+PRINT = os.environ.get("PRINT", "false").lower() in ["true", "y"]
+BATCH_SIZE = 64
+IN_FLIGHT = 2 * (os.cpu_count() or 1)
 
-Game = List[Pattern]
+# number of bits that must differ for a reflection to count
+SMUDGES = 1
+
+# each row (or column) of a pattern as a bitmask, `#` being 1
+Signatures = List[int]
+
+
+@dataclass
+class Pattern:
+    rows: Signatures
+    cols: Signatures
+
+
+Game = Iterator[Pattern]
 
 
 @dataclass
@@ -16,106 +36,142 @@ class Reflection:
     size: int
 
 
-def pretty_print(title: str, pattern: Pattern):
-    print(title, ":")
-    for l in pattern:
-        print("".join(l))
-
-
 def parse(lines: Iterable[str]) -> Game:
-    game: Game = []
-    current: Pattern = []
+    # Rows and columns signatures are built together, in a single pass over the characters.
+    # Patterns are yielded as soon as they are read.
+    current = Pattern(rows=[], cols=[])
 
     for l in lines:
         l = l.strip()
-        if not l and current:
-            game.append(current)
-            current = []
-        else:
-            current.append(l)
-
-    if current:
-        game.append(current)
-
-    return game
-
-
-def safe_get(l: List[str], idx: int) -> Optional[str]:
-    if idx < 0 or idx >= len(l):
-        return None
-
-    return l[idx]
-
-
-def has_single_diff(left: str, right: str):
-    saw_a_diff = False
-    for l, r in zip(left, right):
-        if l == r:
+        if not l:
+            if current.rows:
+                yield current
+                current = Pattern(rows=[], cols=[])
             continue
 
-        if saw_a_diff:
-            return False
-
-        saw_a_diff = True
-
-    return saw_a_diff
-
-
-def find_reflection_offsets(pattern: Pattern) -> Iterator[int]:
-    for i, (current, next) in enumerate(pairwise(pattern)):
-        if current == next or has_single_diff(current, next):
-            yield i
-
-
-def count_reflections(pattern: Pattern) -> Iterator[Reflection]:
-    for first_reflection in find_reflection_offsets(pattern):
-        saw_single_diff = False
-        count = 0
-        while True:
-            small = safe_get(pattern, first_reflection - count)
-            high = safe_get(pattern, first_reflection + count + 1)
-            if (small is None or high is None) and not saw_single_diff:
-                # A normal symmetry with no change is not supported anymore.
-                break
-
-            if (small is None or high is None) and saw_single_diff:
-                pretty_print(f"reflection: {first_reflection} (size {count})", pattern)
-                yield Reflection(beginning=first_reflection, size=count)
-
-            if small != high and saw_single_diff:
+        if not current.cols:
+            current.cols = [0] * len(l)
+
+        row = 0
+        for x, c in enumerate(l):
+            bit = 1 if c == "#" else 0
+            row = (row << 1) | bit
+            current.cols[x] = (current.cols[x] << 1) | bit
+        current.rows.append(row)
+
+    if current.rows:
+        yield current
+
+
+def even_radii(signatures: Signatures) -> List[int]:
+    # Manacher's algorithm, for even-length palindromes only: radii[i] is the number of pairs
+    # (i - t, i + 1 + t) that are equal, going outward from the axis between i and i + 1. O(n).
+    n = len(signatures)
+    radii = [0] * max(n - 1, 0)
+    # the palindrome reaching the furthest on the right: its axis, and its last index
+    center, right = 0, -1
+    for i in range(n - 1):
+        r = 0
+        if i < right:
+            # we are inside the palindrome around `center`, so the axis mirrored through it gives
+            # a lower bound for the radius
+            r = min(radii[2 * center - i], right - i)
+
+        while (
+            i - r >= 0 and i + 1 + r < n and signatures[i - r] == signatures[i + 1 + r]
+        ):
+            r += 1
+
+        radii[i] = r
+        if i + r > right:
+            center, right = i, i + r
+
+    return radii
+
+
+class MirrorHasher:
+    # Polynomial hashes of the signatures and of their reverse, to compare a run going up from
+    # some row with a run going down from another row in O(1).
+    MOD = (1 << 61) - 1
+
+    def __init__(self, signatures: Signatures):
+        self.n = len(signatures)
+        base = random.randrange(1 << 32, self.MOD)
+        self.powers = [1] * (self.n + 1)
+        for i in range(self.n):
+            self.powers[i + 1] = self.powers[i] * base % self.MOD
+        self.forward = self._prefix(signatures, base)
+        self.backward = self._prefix(signatures[::-1], base)
+
+    def _prefix(self, signatures: Signatures, base: int) -> List[int]:
+        prefix = [0] * (len(signatures) + 1)
+        for i, s in enumerate(signatures):
+            prefix[i + 1] = (prefix[i] * base + s) % self.MOD
+        return prefix
+
+    def _hash(self, prefix: List[int], start: int, length: int) -> int:
+        return (prefix[start + length] - prefix[start] * self.powers[length]) % self.MOD
+
+    def extension(self, low: int, high: int) -> int:
+        # largest L such that signatures[low - t] == signatures[high + t] for all t < L, by
+        # binary search. O(log n).
+        lo, hi = 0, max(0, min(low + 1, self.n - high))
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self._hash(self.forward, high, mid) == self._hash(
+                self.backward, self.n - 1 - low, mid
+            ):
+                lo = mid
+            else:
+                hi = mid - 1
+
+        return lo
+
+
+def count_reflections(
+    signatures: Signatures, smudges: int = SMUDGES
+) -> Iterator[Reflection]:
+    # Yields the reflections reaching an edge with exactly `smudges` mismatching bits.
+    #
+    # Manacher's radii give the first mismatching pair around every axis. After that, each
+    # mismatching pair costs at least one bit, so we jump over at most `smudges` of them, each
+    # jump being a hashed binary search to the next mismatch. That makes it O(n) without smudges
+    # and O(n * smudges * log n) with.
+    n = len(signatures)
+    radii = even_radii(signatures)
+    hasher = MirrorHasher(signatures) if smudges else None
+
+    for axis in range(n - 1):
+        size = min(axis + 1, n - 1 - axis)
+        t = radii[axis]
+        budget = smudges
+        while t < size:
+            budget -= (signatures[axis - t] ^ signatures[axis + 1 + t]).bit_count()
+            if budget < 0 or hasher is None:
                 break
 
-            if small is not None and high is not None and has_single_diff(small, high):
-                saw_single_diff = True
+            t += 1
+            t += hasher.extension(axis - t, axis + 1 + t)
 
-            count += 1
-
-
-def rotate(pattern: Pattern) -> Pattern:
-    # pretty_print("before rotation", pattern)
-    length_y = len(pattern)
-    length_x = len(pattern[0])
-    ans = ["".join([pattern[y][x] for y in range(length_y)]) for x in range(length_x)]
-    # pretty_print("after rotation", ans)
-    assert len(pattern) == len(ans[0])
-    assert len(pattern[0]) == len(ans)
-    return ans
+        if t >= size and budget == 0:
+            yield Reflection(beginning=axis, size=size)
 
 
 def solve_single(pattern: Pattern) -> int:
     horizontal_all = sorted(
-        count_reflections(pattern), key=lambda e: e.size, reverse=True
+        count_reflections(pattern.rows), key=lambda e: e.size, reverse=True
     )
     horizontal = horizontal_all[0] if horizontal_all else None
     vertical_all = sorted(
-        count_reflections(rotate(pattern)), key=lambda e: e.size, reverse=True
+        count_reflections(pattern.cols), key=lambda e: e.size, reverse=True
     )
     vertical = vertical_all[0] if vertical_all else None
 
     if horizontal is None and vertical is None:
         return 0
 
-    print(f"hor: {horizontal}, ver: {vertical}")
+    if PRINT:
+        print(f"hor: {horizontal}, ver: {vertical}")
 
     if horizontal and vertical:
         if horizontal.size > vertical.size:
@@ -132,8 +188,31 @@ def solve_single(pattern: Pattern) -> int:
     raise ValueError("Unexpected case.")
 
 
+def batches(game: Iterable[Pattern]) -> Iterator[List[Pattern]]:
+    patterns = iter(game)
+    while batch := list(islice(patterns, BATCH_SIZE)):
+        yield batch
+
+
+def solve_batch(batch: List[Pattern]) -> int:
+    return sum(map(solve_single, batch))
+
+
 def solve(game: Game) -> int:
-    return sum(map(solve_single, game))
+    # Patterns are independent: batches are sent to the workers while the input is being read.
+    # At most IN_FLIGHT batches are pending at once, so memory doesn't grow with the input size.
+    result = 0
+    with Pool() as p:
+        pending: Deque[AsyncResult] = deque()
+        for batch in batches(game):
+            if len(pending) >= IN_FLIGHT:
+                result += pending.popleft().get()
+            pending.append(p.apply_async(solve_batch, (batch,)))
+
+        while pending:
+            result += pending.popleft().get()
+
+    return result
 
 
 if __name__ == "__main__":
@@ -142,7 +221,6 @@ if __name__ == "__main__":
     # End tests of the poor
 
     game = parse(sys.stdin)
-    print(game)
     result = solve(game)
 
     print(result)
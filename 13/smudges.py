@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import os
+import sys
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Reflections "with exactly k smudges", for several k at once. The Hamming distances between
+# rows (and between columns) of each pattern are computed once, then any k is answered from them
+# without searching again.
+#
+#   SMUDGES=0,1 python smudges.py < input.txt   # parts a and b
+#   SMUDGES=all python smudges.py < input.txt   # every k having at least one reflection
+
+SMUDGES = os.environ.get("SMUDGES", "0,1")
+
+# each row (or column) of a pattern as a bitmask, `#` being 1
+Signatures = List[int]
+
+
+@dataclass
+class Pattern:
+    rows: Signatures
+    cols: Signatures
+
+
+Game = Iterator[Pattern]
+
+
+@dataclass
+class Reflection:
+    beginning: int
+    size: int
+
+
+def parse(lines: Iterable[str]) -> Game:
+    # see `parse` in main-a.py
+    current = Pattern(rows=[], cols=[])
+
+    for l in lines:
+        l = l.strip()
+        if not l:
+            if current.rows:
+                yield current
+                current = Pattern(rows=[], cols=[])
+            continue
+
+        if not current.cols:
+            current.cols = [0] * len(l)
+
+        row = 0
+        for x, c in enumerate(l):
+            bit = 1 if c == "#" else 0
+            row = (row << 1) | bit
+            current.cols[x] = (current.cols[x] << 1) | bit
+        current.rows.append(row)
+
+    if current.rows:
+        yield current
+
+
+def hamming_table(signatures: Signatures) -> List[List[int]]:
+    return [[(a ^ b).bit_count() for b in signatures] for a in signatures]
+
+
+def axis_costs(signatures: Signatures) -> List[int]:
+    # number of differing bits across each axis (between i and i + 1), up to the closest edge
+    n = len(signatures)
+    table = hamming_table(signatures)
+    return [
+        sum(table[axis - t][axis + 1 + t] for t in range(min(axis + 1, n - 1 - axis)))
+        for axis in range(n - 1)
+    ]
+
+
+def largest(costs: List[int], k: int) -> Optional[Reflection]:
+    n = len(costs) + 1
+    candidates = [
+        Reflection(beginning=axis, size=min(axis + 1, n - 1 - axis))
+        for axis, cost in enumerate(costs)
+        if cost == k
+    ]
+    return max(candidates, key=lambda e: e.size, default=None)
+
+
+@dataclass
+class SmudgeTable:
+    row_costs: List[int]
+    col_costs: List[int]
+
+    @staticmethod
+    def of(pattern: Pattern) -> SmudgeTable:
+        return SmudgeTable(
+            row_costs=axis_costs(pattern.rows), col_costs=axis_costs(pattern.cols)
+        )
+
+    def summarize(self, k: int) -> int:
+        # same choice as `solve_single` in main-a.py and main-b.py
+        horizontal = largest(self.row_costs, k)
+        vertical = largest(self.col_costs, k)
+
+        if horizontal and (vertical is None or horizontal.size > vertical.size):
+            return (horizontal.beginning + 1) * 100
+
+        if vertical:
+            return vertical.beginning + 1
+
+        return 0
+
+    def summarize_all(self) -> Dict[int, int]:
+        return {k: self.summarize(k) for k in set(self.row_costs + self.col_costs)}
+
+
+def solve(game: Game, smudges: Optional[List[int]] = None) -> Dict[int, int]:
+    # totals per k, for the requested k or for every k found when `smudges` is None
+    totals: Dict[int, int] = {k: 0 for k in smudges or []}
+    for pattern in game:
+        table = SmudgeTable.of(pattern)
+        if smudges is None:
+            for k, value in table.summarize_all().items():
+                totals[k] = totals.get(k, 0) + value
+        else:
+            for k in smudges:
+                totals[k] += table.summarize(k)
+
+    return dict(sorted(totals.items()))
+
+
+if __name__ == "__main__":
+    # Tests of the poor
+    test = [
+        "#.##..##.",
+        "..#.##.#.",
+        "##......#",
+        "##......#",
+        "..#.##.#.",
+        "..##..##.",
+        "#.#.##.#.",
+    ]
+    assert solve(parse(iter(test)), [0, 1]) == {0: 5, 1: 300}
+    # End tests of the poor
+
+    game = parse(sys.stdin)
+    smudges = None if SMUDGES == "all" else [int(k) for k in SMUDGES.split(",")]
+    result = solve(game, smudges)
+
+    for k, total in result.items():
+        print(f"{k}: {total}")
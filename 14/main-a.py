@@ -1,12 +1,14 @@
 from __future__ import annotations
 
+import os
 import sys
-from copy import deepcopy
 from itertools import starmap
-from typing import Hashable, Iterable, Iterator, List, Optional
+from typing import Callable, Hashable, Iterable, Iterator, List, Tuple
 
 Game = List[List[str]]
 
+METHOD = os.environ.get("METHOD", "stream")
+
 
 def parse(lines: Iterable[str]) -> Game:
     stripped = map(lambda s: s.strip(), lines)
@@ -18,40 +20,45 @@ def pretty(game: Game):
         print("".join(l))
 
 
-def upper_stone_offset(game: Game, y: int, x: int) -> Optional[int]:
-    for upper in range(y + 1, len(game), 1):
-        cell = game[upper][x]
-        if cell == "O":
-            return upper
-
+def roll(cells: Game, line: Callable[[int], Tuple[int, int]], length: int):
+    # Rolls the rocks of one line (a row or a column) towards its index 0. `line(i)` gives the
+    # (y, x) of the i-th cell of the line. Rocks only stop on a `#` or on another rock, so we
+    # keep track of the next free slot after the last `#`: one pass per line.
+    free = 0
+    for i in range(length):
+        y, x = line(i)
+        cell = cells[y][x]
         if cell == "#":
-            return None
-
-    return None
-
-
-def tilt_north(game: Game) -> Game:
-    game = deepcopy(game)
-    new_game: Game = []
-    for y in range(len(game)):
-        new_line: List[str] = []
-        for x in range(len(game[y])):
-            cell = game[y][x]
-            if cell == "#" or cell == "O":
-                new_line.append(cell)
-            else:
-                upper_offset = upper_stone_offset(game, y, x)
-                if upper_offset is not None:
-                    # we erase the stone in the original game, as it has been moved
-                    game[upper_offset][x] = "."
-
-                    # current location becomes the new stone
-                    new_line.append("O")
-                else:
-                    new_line.append(".")
-        new_game.append(new_line)
-
-    return new_game
+            free = i + 1
+        elif cell == "O":
+            cells[y][x] = "."
+            free_y, free_x = line(free)
+            cells[free_y][free_x] = "O"
+            free += 1
+
+
+def tilt(game: Game, direction: str) -> Game:
+    # Tilts in place, and returns the game for convenience.
+    height = len(game)
+    width = len(game[0])
+
+    match direction:
+        case "N":
+            for x in range(width):
+                roll(game, lambda i: (i, x), height)
+        case "S":
+            for x in range(width):
+                roll(game, lambda i: (height - 1 - i, x), height)
+        case "W":
+            for y in range(height):
+                roll(game, lambda i: (y, i), width)
+        case "E":
+            for y in range(height):
+                roll(game, lambda i: (y, width - 1 - i), width)
+        case e:
+            raise ValueError(f"unknown direction: {e}")
+
+    return game
 
 
 def count_items(items: Iterator[Hashable]) -> dict[Hashable, int]:
@@ -82,7 +89,7 @@ def assert_equivalent_games(left: Game, right: Game):
 
 
 def solve(game: Game) -> int:
-    tilted = tilt_north(game)
+    tilted = tilt([list(l) for l in game], "N")
     print()
     print("tilted:")
     pretty(tilted)
@@ -97,13 +104,46 @@ def solve(game: Game) -> int:
     )
 
 
+def solve_streaming(lines: Iterable[str]) -> int:
+    # Single pass over the input, without keeping the platform: for each column, we only track
+    # where the next rock would land (the first free slot after the last `#`). A rock landing on
+    # row `slot` weighs `height - slot`, but the height is only known at the end, so we sum the
+    # slots and count the rocks instead.
+    free: List[int] = []
+    n_rocks = 0
+    slots = 0
+    height = 0
+
+    for y, line in enumerate(filter(None, map(lambda s: s.strip(), lines))):
+        if not free:
+            free = [0] * len(line)
+        height = y + 1
+
+        for x, cell in enumerate(line):
+            if cell == "#":
+                free[x] = y + 1
+            elif cell == "O":
+                n_rocks += 1
+                slots += free[x]
+                free[x] += 1
+
+    return n_rocks * height - slots
+
+
 if __name__ == "__main__":
     # Tests of the poor
-
+    test = ["O.#", "..O", "O.O", ""]
+    assert solve_streaming(iter(test)) == 3 + 2 * 2 + 1
     # End tests of the poor
 
-    game = parse(sys.stdin)
-    pretty(game)
-    result = solve(game)
+    match METHOD:
+        case "stream":
+            result = solve_streaming(sys.stdin)
+        case "grid":
+            game = parse(sys.stdin)
+            pretty(game)
+            result = solve(game)
+        case e:
+            raise ValueError(f"unknown method: {e}")
 
     print(result)
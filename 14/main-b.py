@@ -1,12 +1,23 @@
 from __future__ import annotations
 
+import os
+import random
 import sys
-from copy import deepcopy
+import time
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
 from itertools import starmap
-from typing import Hashable, Iterable, Iterator, List, Optional
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
 
 Game = List[List[str]]
 
+CYCLES = 1000000000
+METHOD = os.environ.get("METHOD", "bitboard")
+
+EMPTY, ROUNDED, CUBE = ord("."), ord("O"), ord("#")
+
 
 def parse(lines: Iterable[str]) -> Game:
     stripped = map(lambda s: s.strip(), lines)
@@ -18,40 +29,45 @@ def pretty(game: Game):
         print("".join(l))
 
 
-def upper_stone_offset(game: Game, y: int, x: int) -> Optional[int]:
-    for upper in range(y + 1, len(game), 1):
-        cell = game[upper][x]
-        if cell == "O":
-            return upper
-
+def roll(cells: Game, line: Callable[[int], Tuple[int, int]], length: int):
+    # Rolls the rocks of one line (a row or a column) towards its index 0. `line(i)` gives the
+    # (y, x) of the i-th cell of the line. Rocks only stop on a `#` or on another rock, so we
+    # keep track of the next free slot after the last `#`: one pass per line.
+    free = 0
+    for i in range(length):
+        y, x = line(i)
+        cell = cells[y][x]
         if cell == "#":
-            return None
-
-    return None
-
+            free = i + 1
+        elif cell == "O":
+            cells[y][x] = "."
+            free_y, free_x = line(free)
+            cells[free_y][free_x] = "O"
+            free += 1
+
+
+def tilt(game: Game, direction: str) -> Game:
+    # Tilts in place, and returns the game for convenience.
+    height = len(game)
+    width = len(game[0])
+
+    match direction:
+        case "N":
+            for x in range(width):
+                roll(game, lambda i: (i, x), height)
+        case "S":
+            for x in range(width):
+                roll(game, lambda i: (height - 1 - i, x), height)
+        case "W":
+            for y in range(height):
+                roll(game, lambda i: (y, i), width)
+        case "E":
+            for y in range(height):
+                roll(game, lambda i: (y, width - 1 - i), width)
+        case e:
+            raise ValueError(f"unknown direction: {e}")
 
-def tilt_north(game: Game) -> Game:
-    game = deepcopy(game)
-    new_game: Game = []
-    for y in range(len(game)):
-        new_line: List[str] = []
-        for x in range(len(game[y])):
-            cell = game[y][x]
-            if cell == "#" or cell == "O":
-                new_line.append(cell)
-            else:
-                upper_offset = upper_stone_offset(game, y, x)
-                if upper_offset is not None:
-                    # we erase the stone in the original game, as it has been moved
-                    game[upper_offset][x] = "."
-
-                    # current location becomes the new stone
-                    new_line.append("O")
-                else:
-                    new_line.append(".")
-        new_game.append(new_line)
-
-    return new_game
+    return game
 
 
 def count_items(items: Iterator[Hashable]) -> dict[Hashable, int]:
@@ -81,12 +97,6 @@ def assert_equivalent_games(left: Game, right: Game):
         assert count_items(l) == count_items(r)
 
 
-def rotate(game: Game) -> Game:
-    return [
-        [game[y][x] for y in range(len(game) - 1, -1, -1)] for x in range(len(game[0]))
-    ]
-
-
 def weight(game: Game) -> int:
     count_stones = map(lambda l: l.count("O"), game)
     weights = range(len(game), 0, -1)
@@ -97,51 +107,398 @@ def weight(game: Game) -> int:
 
 
 def cycle(game: Game) -> Game:
-    for _ in range(0, 4):
-        game = tilt_north(game)
-        game = rotate(game)
+    for direction in ["N", "W", "S", "E"]:
+        game = tilt(game, direction)
 
     return game
 
 
-def solve(game: Game) -> int:
-    """We solve this large number N of cycles
-
-    We arbitrary cycle for n <<< N times, then we assume we are running in a cycle.
-    So, we compute the size of the cycle. Then we compute the final position by
-    looking at the position in the array (so, the remainder).
+def state_key(game: Game) -> str:
+    # the exact positions of every rock, so different states can't be mistaken for each other
+    return "".join("".join(l) for l in game)
+
+
+@dataclass(frozen=True)
+class Bitboard:
+    # bit `y * width + x` is set for each rounded (resp. cube) rock
+    rounded: int
+    cubes: int
+    height: int
+    width: int
+
+    @staticmethod
+    def of(game: Game) -> Bitboard:
+        rounded = 0
+        cubes = 0
+        width = len(game[0])
+        for y, line in enumerate(game):
+            for x, cell in enumerate(line):
+                if cell == "O":
+                    rounded |= 1 << (y * width + x)
+                elif cell == "#":
+                    cubes |= 1 << (y * width + x)
+
+        return Bitboard(rounded=rounded, cubes=cubes, height=len(game), width=width)
+
+    def column_mask(self, x: int) -> int:
+        return sum(1 << (y * self.width + x) for y in range(self.height))
+
+    def tilt(self, direction: str) -> Bitboard:
+        # All the rocks with a free cell in front of them move by one cell at once, until none
+        # can move anymore. Rocks on the west (resp. east) edge must not wrap to the previous
+        # (resp. next) row.
+        full = (1 << (self.height * self.width)) - 1
+        match direction:
+            case "N":
+                shift, backward, allowed = self.width, True, full
+            case "W":
+                shift, backward, allowed = 1, True, full ^ self.column_mask(0)
+            case "S":
+                shift, backward, allowed = self.width, False, full
+            case "E":
+                shift, backward, allowed = (
+                    1,
+                    False,
+                    full ^ self.column_mask(self.width - 1),
+                )
+            case e:
+                raise ValueError(f"unknown direction: {e}")
+
+        rounded = self.rounded
+        while True:
+            free = full & ~(rounded | self.cubes)
+            if backward:
+                movable = rounded & (free << shift) & allowed
+                rounded = (rounded ^ movable) | (movable >> shift)
+            else:
+                movable = rounded & (free >> shift) & allowed
+                rounded = (rounded ^ movable) | (movable << shift)
+
+            if not movable:
+                break
+
+        return Bitboard(
+            rounded=rounded, cubes=self.cubes, height=self.height, width=self.width
+        )
+
+    def cycle(self) -> Bitboard:
+        board = self
+        for direction in ["N", "W", "S", "E"]:
+            board = board.tilt(direction)
+
+        return board
+
+    def key(self) -> int:
+        return self.rounded
+
+    def weight(self) -> int:
+        row_mask = (1 << self.width) - 1
+        return sum(
+            (self.height - y)
+            * ((self.rounded >> (y * self.width)) & row_mask).bit_count()
+            for y in range(self.height)
+        )
+
+
+# flat indices (`y * width + x`) of the rounded rocks
+Rocks = Tuple[int, ...]
+
+
+class SegmentIndex:
+    # Cube rocks never move, so for each direction, each cell always rolls into the same segment
+    # (the cells between two `#`, in that direction). We index those once: a tilt then only counts
+    # the rocks of each segment and stacks them from the segment start.
+
+    def __init__(self, game: Game):
+        self.height = len(game)
+        self.width = len(game[0])
+        self.rocks: Rocks = tuple(
+            y * self.width + x
+            for y, line in enumerate(game)
+            for x, cell in enumerate(line)
+            if cell == "O"
+        )
+
+        # per direction: the segment of each cell, and (start, step) of each segment
+        self.segment_of: Dict[str, List[int]] = {}
+        self.segments: Dict[str, List[Tuple[int, int]]] = {}
+
+        h, w = self.height, self.width
+        lines = {
+            "N": [[y * w + x for y in range(h)] for x in range(w)],
+            "S": [[y * w + x for y in range(h - 1, -1, -1)] for x in range(w)],
+            "W": [[y * w + x for x in range(w)] for y in range(h)],
+            "E": [[y * w + x for x in range(w - 1, -1, -1)] for y in range(h)],
+        }
+        for direction, cells in lines.items():
+            segment_of = [-1] * (h * w)
+            segments: List[Tuple[int, int]] = []
+            for line in cells:
+                step = line[1] - line[0] if len(line) > 1 else 0
+                starting = True
+                for idx in line:
+                    y, x = divmod(idx, w)
+                    if game[y][x] == "#":
+                        starting = True
+                        continue
+
+                    if starting:
+                        segments.append((idx, step))
+                        starting = False
+                    segment_of[idx] = len(segments) - 1
+
+            self.segment_of[direction] = segment_of
+            self.segments[direction] = segments
+
+    def tilt(self, rocks: Rocks, direction: str) -> Rocks:
+        segment_of = self.segment_of[direction]
+        segments = self.segments[direction]
+
+        counts = [0] * len(segments)
+        for idx in rocks:
+            counts[segment_of[idx]] += 1
+
+        return tuple(
+            start + i * step
+            for (start, step), count in zip(segments, counts)
+            for i in range(count)
+        )
+
+    def cycle(self, rocks: Rocks) -> Rocks:
+        for direction in ["N", "W", "S", "E"]:
+            rocks = self.tilt(rocks, direction)
+
+        # rocks are listed segment by segment, so the same layout is always the same tuple
+        return rocks
+
+    def weight(self, rocks: Rocks) -> int:
+        return sum(self.height - idx // self.width for idx in rocks)
+
+
+# set in each worker process by `attach_platform`
+worker_cells: Optional[SharedMemory] = None
+worker_height = 0
+worker_width = 0
+
+
+def attach_platform(name: str, height: int, width: int):
+    global worker_cells, worker_height, worker_width
+    worker_cells = SharedMemory(name=name)
+    worker_height = height
+    worker_width = width
+
+
+def roll_lines(task: Tuple[str, int, int]):
+    # `roll_buffer` on the platform attached to this worker
+    assert worker_cells is not None
+    direction, lo, hi = task
+    roll_buffer(worker_cells.buf, worker_height, worker_width, direction, lo, hi)
+
+
+def roll_buffer(cells: memoryview, h: int, w: int, direction: str, lo: int, hi: int):
+    # Same as `roll`, on the lines [lo, hi) of a flat platform: columns for a north or south
+    # tilt, rows for a west or east one.
+    for line in range(lo, hi):
+        match direction:
+            case "N":
+                first, step, length = line, w, h
+            case "S":
+                first, step, length = (h - 1) * w + line, -w, h
+            case "W":
+                first, step, length = line * w, 1, w
+            case "E":
+                first, step, length = line * w + w - 1, -1, w
+            case e:
+                raise ValueError(f"unknown direction: {e}")
+
+        free = first
+        idx = first
+        for _ in range(length):
+            cell = cells[idx]
+            if cell == CUBE:
+                free = idx + step
+            elif cell == ROUNDED:
+                cells[idx] = EMPTY
+                cells[free] = ROUNDED
+                free += step
+            idx += step
+
+
+class ParallelPlatform:
+    # The platform lives in a shared-memory byte buffer, and each tilt splits its columns (or
+    # rows) across a persistent pool of workers. The only synchronization is waiting for all the
+    # chunks of a tilt to be done.
+    #
+    # With `serial`, there is no pool and the whole buffer is rolled in-process: same layout and
+    # same code, so comparing both only measures what the pool brings.
+
+    def __init__(self, game: Game, workers: Optional[int] = None, serial: bool = False):
+        self.height = len(game)
+        self.width = len(game[0])
+        self.workers = 1 if serial else workers or os.cpu_count() or 1
+        self.shared = SharedMemory(create=True, size=self.height * self.width)
+        self.shared.buf[: self.height * self.width] = "".join(
+            "".join(l) for l in game
+        ).encode()
+        self.pool = (
+            None
+            if serial
+            else Pool(
+                self.workers,
+                initializer=attach_platform,
+                initargs=(self.shared.name, self.height, self.width),
+            )
+        )
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+        self.shared.close()
+        self.shared.unlink()
+
+    def __enter__(self) -> ParallelPlatform:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def tilt(self, direction: str):
+        lines = self.width if direction in ["N", "S"] else self.height
+        if self.pool is None:
+            buf = self.shared.buf
+            roll_buffer(buf, self.height, self.width, direction, 0, lines)
+            return
+
+        n_chunks = min(lines, self.workers)
+        self.pool.map(
+            roll_lines,
+            [
+                (direction, lines * i // n_chunks, lines * (i + 1) // n_chunks)
+                for i in range(n_chunks)
+            ],
+        )
+
+    def cycle(self) -> ParallelPlatform:
+        for direction in ["N", "W", "S", "E"]:
+            self.tilt(direction)
+
+        return self
+
+    def key(self) -> bytes:
+        return bytes(self.shared.buf[: self.height * self.width])
+
+    def weight(self) -> int:
+        cells = self.key()
+        return sum(
+            (self.height - y)
+            * cells.count(ROUNDED, y * self.width, (y + 1) * self.width)
+            for y in range(self.height)
+        )
+
+
+State = TypeVar("State")
+
+
+def find_weight(
+    state: State,
+    spin: Callable[[State], State],
+    key: Callable[[State], Hashable],
+    load: Callable[[State], int],
+    cycles: int,
+) -> int:
+    """We solve this large number of cycles
+
+    Each state is recorded with the index of the cycle that produced it, along with its weight.
+    As soon as a state comes back, we know the period, and the weight after any number of cycles
+    is read from what we have recorded.
     """
 
-    N = 1000000000
-    n = 300
-
-    for _ in range(0, n):
-        N -= 1
-        game = cycle(game)
-
-    current = -1
-    recorded_weights: List[int] = [weight(game)]
-
-    print(f"Start to look for a cycle")
-
-    while current != recorded_weights[0]:
-        N -= 1
-        game = cycle(game)
-        current = weight(game)
-        recorded_weights.append(current)
-
-    print(f"Cycle found: {len(recorded_weights)} (remaining cycles: {N})")
-    print(recorded_weights)
-
-    # we shamelessly substract 1 to the length to ignore the latest weight with is the same as the beginning
-    return recorded_weights[N % (len(recorded_weights) - 1)]
+    seen: Dict[Hashable, int] = {key(state): 0}
+    recorded_weights: List[int] = [load(state)]
+
+    for n in range(1, cycles + 1):
+        state = spin(state)
+        state_key = key(state)
+
+        if state_key in seen:
+            start = seen[state_key]
+            period = n - start
+            print(f"Cycle found: {period} (starting after {start} cycles)")
+            return recorded_weights[start + (cycles - start) % period]
+
+        seen[state_key] = n
+        recorded_weights.append(load(state))
+
+    return recorded_weights[cycles]
+
+
+def solve(game: Game, cycles: int = CYCLES) -> int:
+    match METHOD:
+        case "grid":
+            return find_weight(game, cycle, state_key, weight, cycles)
+        case "bitboard":
+            return find_weight(
+                Bitboard.of(game), Bitboard.cycle, Bitboard.key, Bitboard.weight, cycles
+            )
+        case "index":
+            index = SegmentIndex(game)
+            return find_weight(index.rocks, index.cycle, tuple, index.weight, cycles)
+        case "parallel":
+            with ParallelPlatform(game) as platform:
+                return find_weight(
+                    platform,
+                    ParallelPlatform.cycle,
+                    ParallelPlatform.key,
+                    ParallelPlatform.weight,
+                    cycles,
+                )
+        case e:
+            raise ValueError(f"unknown method: {e}")
+
+
+def bench(sizes: List[int], spins: int = 3):
+    # Times a few spin cycles of random square platforms, in-process tilts against pooled ones.
+    # Both run over the same shared byte buffer, so the crossover only comes from the pool.
+    crossover: Optional[int] = None
+    for size in sizes:
+        r = random.Random(size)
+        game = [[r.choice("OO.....#") for _ in range(size)] for _ in range(size)]
+
+        def timed(serial: bool) -> Tuple[float, bytes]:
+            start = time.perf_counter()
+            with ParallelPlatform(game, serial=serial) as platform:
+                for _ in range(spins):
+                    platform.cycle()
+                return time.perf_counter() - start, platform.key()
+
+        serial_time, serial_key = timed(serial=True)
+        parallel_time, parallel_key = timed(serial=False)
+        assert serial_key == parallel_key
+
+        print(
+            f"{size}x{size}: serial {serial_time:.3f}s, parallel {parallel_time:.3f}s"
+        )
+        if crossover is None and parallel_time < serial_time:
+            crossover = size
+
+    if crossover is None:
+        print(f"parallel never beats serial up to {sizes[-1]}x{sizes[-1]}")
+    else:
+        print(f"parallel beats serial from {crossover}x{crossover}")
 
 
 if __name__ == "__main__":
     # Tests of the poor
+    test = parse(iter(["O.#", "..O", "O.."]))
+    assert [solve([list(l) for l in test], n) for n in range(4)] == [6, 4, 6, 6]
 
     # End tests of the poor
 
+    if "--bench" in sys.argv:
+        bench([50, 100, 200, 400, 800, 1600])
+        sys.exit(0)
+
     game = parse(sys.stdin)
     pretty(game)
     result = solve(game)
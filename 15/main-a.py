@@ -1,42 +1,57 @@
 from __future__ import annotations
 
 import sys
-from typing import Iterable
+from typing import Iterable, List
 
-Game = Iterable[str]
+Game = Iterable[bytes]
 
 
-def parse(lines: Iterable[str]) -> Game:
+def parse(lines: Iterable[bytes]) -> Game:
     for l in lines:
         l = l.strip()
         if not l:
             continue
 
-        for elem in l.split(","):
+        for elem in l.split(b","):
             yield elem
 
 
-def compute_hash(s: str) -> int:
+# HASH of the current value (high byte) followed by a character (low byte)
+TRANSITIONS = bytes((state + c) * 17 % 256 for state in range(256) for c in range(256))
+
+
+def compute_hash(s: bytes) -> int:
     current = 0
     for c in s:
-        code = ord(c)
-        current += code
-        current *= 17
-        current %= 256
+        current = TRANSITIONS[current << 8 | c]
 
     return current
 
 
+def hash_all(tokens: Iterable[bytes]) -> List[int]:
+    # batch version of `compute_hash`: the whole list is hashed in one call
+    table = TRANSITIONS
+    hashes: List[int] = []
+    for token in tokens:
+        current = 0
+        for c in token:
+            current = table[current << 8 | c]
+        hashes.append(current)
+
+    return hashes
+
+
 def solve(game: Game) -> int:
-    return sum(map(compute_hash, game))
+    return sum(hash_all(game))
 
 
 if __name__ == "__main__":
     # Tests of the poor
-    assert compute_hash("HASH") == 52
+    assert compute_hash(b"HASH") == 52
+    assert hash_all([b"rn=1", b"cm-"]) == [30, 253]
     # End tests of the poor
 
-    game = list(parse(sys.stdin))
+    game = list(parse(sys.stdin.buffer))
     result = solve(game)
 
     print(result)
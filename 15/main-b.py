@@ -2,41 +2,62 @@ from __future__ import annotations
 
 import sys
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Iterable, List
 
-Game = Iterable[str]
+Game = Iterable[bytes]
 
 
 @dataclass
 class Lens:
-    label: str
+    label: bytes
     value: int
 
     def __repr__(self) -> str:
-        return f"{self.label} {self.value}"
+        return f"{self.label.decode()} {self.value}"
 
 
-def parse(lines: Iterable[str]) -> Game:
+def parse(lines: Iterable[bytes]) -> Game:
     for l in lines:
         l = l.strip()
         if not l:
             continue
 
-        for elem in l.split(","):
+        for elem in l.split(b","):
             yield elem
 
 
-def compute_hash(s: str) -> int:
+# HASH of the current value (high byte) followed by a character (low byte)
+TRANSITIONS = bytes((state + c) * 17 % 256 for state in range(256) for c in range(256))
+
+
+def compute_hash(s: bytes) -> int:
     current = 0
     for c in s:
-        code = ord(c)
-        current += code
-        current *= 17
-        current %= 256
+        current = TRANSITIONS[current << 8 | c]
 
     return current
 
 
+def hash_all(tokens: Iterable[bytes]) -> List[int]:
+    # batch version of `compute_hash`: the whole list is hashed in one call
+    table = TRANSITIONS
+    hashes: List[int] = []
+    for token in tokens:
+        current = 0
+        for c in token:
+            current = table[current << 8 | c]
+        hashes.append(current)
+
+    return hashes
+
+
+@lru_cache(maxsize=4096)
+def box_index(label: bytes) -> int:
+    # labels come back over and over, so their box is memoized
+    return compute_hash(label)
+
+
 def compute_boxes_weight(boxes: List[List[Lens]]) -> int:
     sum = 0
     for box_number, box in enumerate(boxes, start=1):
@@ -49,18 +70,17 @@ def compute_boxes_weight(boxes: List[List[Lens]]) -> int:
 def solve(game: Game) -> int:
     boxes: List[List[Lens]] = [list() for _ in range(256)]
     for v in game:
-        if v[-1] == "-":
+        if v.endswith(b"-"):
             # Remove the label
             label = v[:-1]
-            hash = compute_hash(label)
-            box_idx = hash % len(boxes)
+            box_idx = box_index(label) % len(boxes)
             box = boxes[box_idx]
             boxes[box_idx] = list(filter(lambda l: l.label != label, box))
         else:
             # Add or update
-            label, val = v.split("=")
+            label, val = v.split(b"=")
             lens = Lens(label=label, value=int(val))
-            box_idx = compute_hash(label) % len(boxes)
+            box_idx = box_index(label) % len(boxes)
 
             labels = list(map(lambda l: l.label, boxes[box_idx]))
             try:
@@ -74,10 +94,11 @@ def solve(game: Game) -> int:
 
 if __name__ == "__main__":
     # Tests of the poor
-    assert compute_hash("HASH") == 52
+    assert compute_hash(b"HASH") == 52
+    assert hash_all([b"rn=1", b"cm-"]) == [30, 253]
     # End tests of the poor
 
-    game = list(parse(sys.stdin))
+    game = list(parse(sys.stdin.buffer))
     result = solve(game)
 
     print(result)